@@ -0,0 +1,51 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table(
+        "groups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("groups.id"), nullable=True),
+    )
+    op.create_index("ix_groups_id", "groups", ["id"])
+    op.create_index("ix_groups_name", "groups", ["name"])
+    op.create_index("ix_groups_parent_id", "groups", ["parent_id"])
+    op.create_index(
+        "idx_groups_name_trgm", "groups", ["name"],
+        postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+    op.create_table(
+        "students",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("email", sa.String()),
+        sa.Column("group_id", sa.Integer(), sa.ForeignKey("groups.id")),
+    )
+    op.create_index("ix_students_id", "students", ["id"])
+    op.create_index("ix_students_name", "students", ["name"])
+    op.create_index(
+        "idx_students_name_trgm", "students", ["name"],
+        postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_table("students")
+    op.drop_table("groups")
@@ -0,0 +1,40 @@
+"""group_tree_json function
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+CREATE OR REPLACE FUNCTION group_tree_json(root_id integer) RETURNS jsonb
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+    RETURN (
+        SELECT jsonb_build_object(
+            'id', g.id,
+            'name', g.name,
+            'parent_id', g.parent_id,
+            'subGroups', COALESCE(
+                (SELECT jsonb_agg(group_tree_json(c.id) ORDER BY c.id) FROM groups c WHERE c.parent_id = g.id),
+                '[]'::jsonb
+            )
+        )
+        FROM groups g
+        WHERE g.id = root_id
+    );
+END;
+$$
+""")
+
+
+def downgrade():
+    op.execute("DROP FUNCTION IF EXISTS group_tree_json(integer)")
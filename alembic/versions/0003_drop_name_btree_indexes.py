@@ -0,0 +1,28 @@
+"""drop B-tree indexes on name columns
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Поиск идёт через ILIKE '%q%' — его обслуживают триграммные GIN-индексы,
+    # B-tree по name не используется и только замедляет запись
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_groups_name_trgm ON groups USING gin (name gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_students_name_trgm ON students USING gin (name gin_trgm_ops)")
+    op.drop_index("ix_groups_name", table_name="groups")
+    op.drop_index("ix_students_name", table_name="students")
+
+
+def downgrade():
+    op.create_index("ix_groups_name", "groups", ["name"])
+    op.create_index("ix_students_name", "students", ["name"])
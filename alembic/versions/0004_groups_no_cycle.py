@@ -0,0 +1,48 @@
+"""forbid cycles in groups tree
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_check_constraint("no_self_parent", "groups", "id <> parent_id")
+    op.execute("""
+CREATE OR REPLACE FUNCTION groups_prevent_cycle() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (
+        WITH RECURSIVE ancestors AS (
+            SELECT id, parent_id FROM groups WHERE id = NEW.parent_id
+            UNION
+            SELECT g.id, g.parent_id FROM groups g JOIN ancestors a ON g.id = a.parent_id
+        )
+        SELECT 1 FROM ancestors WHERE id = NEW.id
+    ) THEN
+        RAISE EXCEPTION 'group % cannot be moved under its own subgroup', NEW.id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$
+""")
+    op.execute("""
+CREATE OR REPLACE TRIGGER groups_no_cycle
+BEFORE UPDATE OF parent_id ON groups
+FOR EACH ROW WHEN (NEW.parent_id IS NOT NULL)
+EXECUTE FUNCTION groups_prevent_cycle()
+""")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS groups_no_cycle ON groups")
+    op.execute("DROP FUNCTION IF EXISTS groups_prevent_cycle()")
+    op.drop_constraint("no_self_parent", "groups", type_="check")
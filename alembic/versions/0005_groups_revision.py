@@ -0,0 +1,44 @@
+"""groups revision counter
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "groups_revision",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("revision", sa.BigInteger(), nullable=False),
+    )
+    op.execute("INSERT INTO groups_revision (id, revision) VALUES (1, 0)")
+    op.execute("""
+CREATE OR REPLACE FUNCTION groups_bump_revision() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE groups_revision SET revision = revision + 1 WHERE id = 1;
+    RETURN NULL;
+END;
+$$
+""")
+    op.execute("""
+CREATE OR REPLACE TRIGGER groups_revision_bump
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON groups
+FOR EACH STATEMENT
+EXECUTE FUNCTION groups_bump_revision()
+""")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS groups_revision_bump ON groups")
+    op.execute("DROP FUNCTION IF EXISTS groups_bump_revision()")
+    op.drop_table("groups_revision")
@@ -0,0 +1,44 @@
+"""serialize parent changes in groups cycle check
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _create_function(lock: bool):
+    op.execute("""
+CREATE OR REPLACE FUNCTION groups_prevent_cycle() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+""" + ("    PERFORM pg_advisory_xact_lock(hashtext('groups_tree'));\n" if lock else "") + """    IF EXISTS (
+        WITH RECURSIVE ancestors AS (
+            SELECT id, parent_id FROM groups WHERE id = NEW.parent_id
+            UNION
+            SELECT g.id, g.parent_id FROM groups g JOIN ancestors a ON g.id = a.parent_id
+        )
+        SELECT 1 FROM ancestors WHERE id = NEW.id
+    ) THEN
+        RAISE EXCEPTION 'group % cannot be moved under its own subgroup', NEW.id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$
+""")
+
+
+def upgrade():
+    # Без лока два параллельных UPDATE видят старое дерево и вместе создают цикл
+    _create_function(lock=True)
+
+
+def downgrade():
+    _create_function(lock=False)
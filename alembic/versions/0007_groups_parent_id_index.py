@@ -0,0 +1,23 @@
+"""ensure index on groups.parent_id
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # В базах, созданных через create_all до появления миграций, этого индекса нет:
+    # их помечают ревизией 0001 (alembic stamp 0001), и сама 0001 не выполняется
+    op.execute("CREATE INDEX IF NOT EXISTS ix_groups_parent_id ON groups (parent_id)")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,31 @@
+"""run groups cycle check only when parent_id changes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def _create_trigger(condition: str):
+    op.execute(f"""
+CREATE OR REPLACE TRIGGER groups_no_cycle
+BEFORE UPDATE OF parent_id ON groups
+FOR EACH ROW WHEN ({condition})
+EXECUTE FUNCTION groups_prevent_cycle()
+""")
+
+
+def upgrade():
+    # UPDATE из API всегда перечисляет parent_id в SET — переименование не должно брать лок
+    _create_trigger("NEW.parent_id IS NOT NULL AND NEW.parent_id IS DISTINCT FROM OLD.parent_id")
+
+
+def downgrade():
+    _create_trigger("NEW.parent_id IS NOT NULL")
@@ -0,0 +1,26 @@
+"""students.group_id: ON DELETE SET NULL
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Группы удаляются Core DELETE без загрузки студентов — обнуление FK делает БД
+    op.drop_constraint("students_group_id_fkey", "students", type_="foreignkey")
+    op.create_foreign_key(
+        "students_group_id_fkey", "students", "groups", ["group_id"], ["id"], ondelete="SET NULL"
+    )
+
+
+def downgrade():
+    op.drop_constraint("students_group_id_fkey", "students", type_="foreignkey")
+    op.create_foreign_key("students_group_id_fkey", "students", "groups", ["group_id"], ["id"])
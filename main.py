@@ -1,47 +1,306 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
-from sqlalchemy import Column, Integer, String, ForeignKey, create_engine
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base, Session
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, CheckConstraint, DDL, bindparam, delete, event, Index, exists, insert, or_, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, relationship, declarative_base
+from contextlib import asynccontextmanager
 from typing import Optional, List
 from pydantic import BaseModel
 from fastapi import status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from cachetools import TTLCache
 import os
 
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/postgres")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:postgres@db:5432/postgres")
+# Старый формат URL без драйвера тоже принимаем — подставляем asyncpg
+if DATABASE_URL.startswith("postgresql://"):
+    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_timeout=30,
+    query_cache_size=1200,
+    # JIT на коротких OLTP-запросах только добавляет время планирования
+    connect_args={"server_settings": {"jit": "off", "application_name": "students_api"}},
+)
+# В проде схемой управляет Alembic (alembic upgrade head), create_all — для локального запуска
+AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES", "1") == "1"
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
 Base = declarative_base()
 
-app = FastAPI()
+# Кэш готовых JSON-ответов для читающих endpoint'ов: ключ (endpoint, параметры).
+# Кэш живёт в процессе воркера, TTL ограничивает устаревание между воркерами
+CACHE_TTL = int(os.getenv("CACHE_TTL", "30"))
+response_cache = TTLCache(maxsize=1024, ttl=CACHE_TTL)
+# Ответы больше этого размера не кэшируем, чтобы не держать их целиком в памяти
+CACHE_MAX_BODY = int(os.getenv("CACHE_MAX_BODY", str(1024 * 1024)))
+
+# Ограничение на размер одного пакета в /students/bulk и /groups/bulk
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "1000"))
+
+
+def cached_response(key):
+    body = response_cache.get(key)
+    if body is None:
+        return None
+    return Response(content=body, media_type="application/json")
+
+
+def cache_response(key, content) -> Response:
+    # Данные из БД уже проверены — сериализуем dict'ы напрямую через orjson, без pydantic
+    response = ORJSONResponse(content=content)
+    # Большие ответы (например, полный список студентов) в кэш не кладём
+    if len(response.body) <= CACHE_MAX_BODY:
+        response_cache[key] = response.body
+    return response
+
+
+def cache_streaming_response(key, chunks) -> StreamingResponse:
+    # Отдаём готовые JSON-фрагменты по мере получения; если ответ небольшой,
+    # после отправки сохраняем его в кэш целиком
+    async def body():
+        parts, size = [], 0
+        async for chunk in chunks:
+            if parts is not None:
+                parts.append(chunk)
+                size += len(chunk)
+                if size > CACHE_MAX_BODY:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            response_cache[key] = b"".join(parts)
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def cache_invalidate(endpoint: str, *params):
+    # Без параметров сбрасываем все ключи endpoint'а (например, все варианты query)
+    for key in list(response_cache.keys()):
+        if key[0] == endpoint and (not params or key[1:] == params):
+            response_cache.pop(key, None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Создаём таблицы один раз при старте, а не при импорте модуля
+    if AUTO_CREATE_TABLES:
+        async with engine.begin() as conn:
+            # pg_trgm нужен для GIN-индексов под поиск ILIKE '%q%'
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match: список через запятую, слабые W/-теги или "*"
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
 
 # SQLAlchemy models
 class Group(Base):
     __tablename__ = 'groups'
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    parent_id = Column(Integer, ForeignKey('groups.id'), nullable=True)
+    name = Column(String)
+    parent_id = Column(Integer, ForeignKey('groups.id'), nullable=True, index=True)
 
     # рекурсивная связь
     subgroups = relationship(
         "Group",
         backref='parent',
         remote_side=[id],
-        lazy="selectin"  # 🔥 ЗАГРУЖАЕМ ДЕТЕЙ ПРИ ЗАПРОСЕ РОДИТЕЛЯ
+        # Загрузку явно включаем через selectinload там, где она нужна;
+        # иначе каждый запрос групп тянул бы лишний SELECT ... WHERE parent_id IN (...)
+        lazy="raise"
     )
 
     students = relationship("Student", back_populates="group")
 
+    __table_args__ = (
+        # B-tree не помогает для ILIKE с ведущим '%', нужен триграммный индекс
+        Index("idx_groups_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        CheckConstraint("id <> parent_id", name="no_self_parent"),
+    )
+
+
+# SQLSTATE ошибок целостности, которые отдаём клиенту как 400
+CHECK_VIOLATION = "23514"
+FOREIGN_KEY_VIOLATION = "23503"
+
+# Поддерево группы в JSON. Функция рекурсивная, поэтому plpgsql:
+# тело SQL-функции проверяется при создании, когда её самой ещё нет
+GROUP_TREE_JSON_FUNCTION = """
+CREATE OR REPLACE FUNCTION group_tree_json(root_id integer) RETURNS jsonb
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+    RETURN (
+        SELECT jsonb_build_object(
+            'id', g.id,
+            'name', g.name,
+            'parent_id', g.parent_id,
+            'subGroups', COALESCE(
+                (SELECT jsonb_agg(group_tree_json(c.id) ORDER BY c.id) FROM groups c WHERE c.parent_id = g.id),
+                '[]'::jsonb
+            )
+        )
+        FROM groups g
+        WHERE g.id = root_id
+    );
+END;
+$$
+"""
+
+event.listen(Base.metadata, "after_create", DDL(GROUP_TREE_JSON_FUNCTION))
+
+# Запрет циклов в дереве: новый родитель не может быть потомком самой группы.
+# Ошибка поднимается с кодом check_violation, как и у ограничения no_self_parent
+# ('%%' — экранирование для DDL). Смены родителя сериализуются advisory-локом до
+# конца транзакции: иначе два параллельных UPDATE (A под B и B под A) проверили бы
+# старое дерево и вместе создали цикл. После взятия лока запрос видит свежий
+# снимок (READ COMMITTED), в том числе изменения транзакции, державшей лок
+GROUPS_NO_CYCLE_FUNCTION = """
+CREATE OR REPLACE FUNCTION groups_prevent_cycle() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('groups_tree'));
+    IF EXISTS (
+        WITH RECURSIVE ancestors AS (
+            SELECT id, parent_id FROM groups WHERE id = NEW.parent_id
+            UNION
+            SELECT g.id, g.parent_id FROM groups g JOIN ancestors a ON g.id = a.parent_id
+        )
+        SELECT 1 FROM ancestors WHERE id = NEW.id
+    ) THEN
+        RAISE EXCEPTION 'group %% cannot be moved under its own subgroup', NEW.id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$
+"""
+
+# _update_group всегда пишет parent_id в SET, поэтому без проверки на изменение
+# триггер (и глобальный лок) срабатывал бы и на простое переименование
+GROUPS_NO_CYCLE_TRIGGER = """
+CREATE OR REPLACE TRIGGER groups_no_cycle
+BEFORE UPDATE OF parent_id ON groups
+FOR EACH ROW WHEN (NEW.parent_id IS NOT NULL AND NEW.parent_id IS DISTINCT FROM OLD.parent_id)
+EXECUTE FUNCTION groups_prevent_cycle()
+"""
+
+event.listen(Base.metadata, "after_create", DDL(GROUPS_NO_CYCLE_FUNCTION))
+event.listen(Base.metadata, "after_create", DDL(GROUPS_NO_CYCLE_TRIGGER))
+
 
 class Student(Base):
     __tablename__ = 'students'
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    name = Column(String)
     email = Column(String)
-    group_id = Column(Integer, ForeignKey('groups.id'))
+    # При удалении группы студенты остаются без группы — это делает сама БД
+    group_id = Column(Integer, ForeignKey('groups.id', ondelete="SET NULL"))
 
     group = relationship("Group", back_populates="students")
 
+    __table_args__ = (
+        Index("idx_students_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
+# Ревизия дерева групп: одна строка, которую триггер увеличивает на каждую запись
+# в groups. Общая для всех воркеров и для записей в обход API — входит в ключ кэша
+# и ETag для GET /groups
+class GroupsRevision(Base):
+    __tablename__ = 'groups_revision'
+    id = Column(Integer, primary_key=True)
+    revision = Column(BigInteger, nullable=False, default=0)
+
+
+GROUPS_REVISION_SEED = "INSERT INTO groups_revision (id, revision) VALUES (1, 0) ON CONFLICT (id) DO NOTHING"
+
+GROUPS_REVISION_FUNCTION = """
+CREATE OR REPLACE FUNCTION groups_bump_revision() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE groups_revision SET revision = revision + 1 WHERE id = 1;
+    RETURN NULL;
+END;
+$$
+"""
+
+GROUPS_REVISION_TRIGGER = """
+CREATE OR REPLACE TRIGGER groups_revision_bump
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON groups
+FOR EACH STATEMENT
+EXECUTE FUNCTION groups_bump_revision()
+"""
+
+event.listen(Base.metadata, "after_create", DDL(GROUPS_REVISION_SEED))
+event.listen(Base.metadata, "after_create", DDL(GROUPS_REVISION_FUNCTION))
+event.listen(Base.metadata, "after_create", DDL(GROUPS_REVISION_TRIGGER))
+
+# Запросы собираем один раз на уровне модуля: параметры передаются через bindparam,
+# скомпилированный SQL берётся из кэша движка. Поиск по PK — через db.get(),
+# он сначала смотрит в identity map сессии
+_group_has_children = select(exists().where(Group.parent_id == bindparam("group_id")))
+# Core DELETE: ORM-удаление подгружало бы подгруппы и студентов, чтобы обнулить их FK
+_delete_group = delete(Group).where(Group.id == bindparam("group_id")).execution_options(synchronize_session=False)
+
+# Берём только колонки StudentOut: строки Row легче ORM-объектов (нет состояния
+# и identity map), а ленивых загрузок и N+1 здесь не может быть в принципе
+_students_all = select(Student.id, Student.name, Student.group_id)
+_students_search = _students_all.join(Group).where(
+    Student.name.ilike(bindparam("pattern")) | Group.name.ilike(bindparam("pattern"))
+)
+
+# Обновление группы за один запрос: существование родителя проверяется в том же UPDATE
+_parent = aliased(Group)
+_update_group = (
+    update(Group)
+    .where(
+        Group.id == bindparam("group_id"),
+        or_(
+            bindparam("new_parent_id", type_=Integer).is_(None),
+            exists().where(_parent.id == bindparam("new_parent_id", type_=Integer)),
+        ),
+    )
+    .values(name=bindparam("new_name"), parent_id=bindparam("new_parent_id", type_=Integer))
+    .returning(Group.id, Group.name, Group.parent_id)
+    .execution_options(synchronize_session=False)
+)
+
+_groups_revision = select(GroupsRevision.revision).where(GroupsRevision.id == 1)
+
+_groups_search = select(Group.id, Group.name).where(Group.name.ilike(bindparam("pattern")))
+
+# Полное дерево собирает Postgres: по строке с готовым JSON на каждую корневую группу
+_groups_tree = text("SELECT group_tree_json(id)::text FROM groups WHERE parent_id IS NULL ORDER BY id")
+
+
+async def stream_groups_tree():
+    # Своё соединение: генератор дочитывает курсор уже после выхода из обработчика
+    yield b"["
+    async with engine.connect() as conn:
+        result = await conn.stream(_groups_tree)
+        first = True
+        async for (subtree,) in result:
+            yield subtree.encode() if first else b"," + subtree.encode()
+            first = False
+    yield b"]"
+
 # Pydantic schemas
 class GroupBase(BaseModel):
     name: str
@@ -86,154 +345,248 @@ class StudentOut(BaseModel):
         from_attributes = True
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_db():
+    # При любой ошибке в обработчике — rollback. Commit здесь не делаем: код после
+    # yield может выполниться уже после отправки ответа, и ошибка commit'а
+    # не дошла бы до клиента
+    async with SessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
 
 # CRUD endpoints
 @app.post("/students", response_model=StudentOut)
-def create_student(student: StudentCreate, db: Session = Depends(get_db)):
-    db_student = Student(**student.dict())
-    db.add(db_student)
-    db.commit()
-    db.refresh(db_student)
-    return db_student
+async def create_student(student: StudentCreate, db: AsyncSession = Depends(get_db)):
+    # INSERT ... RETURNING вместо add + refresh: один запрос вместо двух
+    result = await db.execute(
+        insert(Student).values(**student.model_dump(exclude_unset=True)).returning(Student.id, Student.name, Student.group_id)
+    )
+    row = result.mappings().one()
+    await db.commit()
+    cache_invalidate("get_students")
+    return ORJSONResponse(content=dict(row))
+
+@app.post("/students/bulk", response_model=List[StudentOut])
+async def create_students_bulk(students: List[StudentCreate], db: AsyncSession = Depends(get_db)):
+    if not students:
+        return []
+    if len(students) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} students per request"
+        )
+    # Пакетная вставка одним multi-row INSERT
+    result = await db.execute(
+        # Ответ сопоставляется с запросом по позиции — порядок строк RETURNING фиксируем
+        insert(Student).returning(Student.id, Student.name, Student.group_id, sort_by_parameter_order=True),
+        # Для executemany у всех строк должен быть одинаковый набор ключей — без exclude_unset
+        [s.model_dump() for s in students],
+    )
+    rows = [dict(row) for row in result.mappings()]
+    await db.commit()
+    cache_invalidate("get_students")
+    return ORJSONResponse(content=rows)
 
 @app.get("/students", response_model=List[StudentOut])
-def get_students(query: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    q = db.query(Student)
+async def get_students(query: Optional[str] = Query(None), db: AsyncSession = Depends(get_db)):
+    key = ("get_students", query)
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+
     if query:
-        q = q.join(Group).filter((Student.name.ilike(f"%{query}%")) | (Group.name.ilike(f"%{query}%")))
-    return q.all()
+        result = await db.execute(_students_search, {"pattern": f"%{query}%"})
+    else:
+        result = await db.execute(_students_all)
+    return cache_response(key, [
+        {"id": student_id, "name": name, "group_id": group_id} for student_id, name, group_id in result
+    ])
 
 @app.get("/students/{student_id}", response_model=StudentOut)
-def get_student(student_id: int, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.id == student_id).first()
+async def get_student(student_id: int, db: AsyncSession = Depends(get_db)):
+    key = ("get_student", student_id)
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+
+    student = await db.get(Student, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    return student
+    return cache_response(key, {"id": student.id, "name": student.name, "group_id": student.group_id})
 
 @app.put("/students/{student_id}", response_model=StudentOut)
-def update_student(student_id: int, student: StudentCreate, db: Session = Depends(get_db)):
-    db_student = db.query(Student).filter(Student.id == student_id).first()
+async def update_student(student_id: int, student: StudentCreate, db: AsyncSession = Depends(get_db)):
+    db_student = await db.get(Student, student_id)
     if not db_student:
         raise HTTPException(status_code=404, detail="Student not found")
-    for field, value in student.dict().items():
+    # Переносим только поля, которые клиент действительно прислал
+    for field, value in student.model_dump(exclude_unset=True).items():
         setattr(db_student, field, value)
-    db.commit()
+    await db.commit()
+    cache_invalidate("get_student", student_id)
+    cache_invalidate("get_students")
     return db_student
 
 @app.delete("/students/{student_id}")
-def delete_student(student_id: int, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.id == student_id).first()
+async def delete_student(student_id: int, db: AsyncSession = Depends(get_db)):
+    student = await db.get(Student, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    db.delete(student)
-    db.commit()
+    await db.delete(student)
+    await db.commit()
+    cache_invalidate("get_student", student_id)
+    cache_invalidate("get_students")
     return {"message": "Student deleted"}
 
 @app.post("/groups", response_model=GroupOut)
-def create_group(group: GroupCreate, db: Session = Depends(get_db)):
-    data = group.dict()
-    if data["parent_id"] == 0:
+async def create_group(group: GroupCreate, db: AsyncSession = Depends(get_db)):
+    data = group.model_dump(exclude_unset=True)
+    if data.get("parent_id") == 0:
         data["parent_id"] = None
-    db_group = Group(**data)
-    db.add(db_group)
-    db.commit()
-    db.refresh(db_group)
-    return db_group
-@app.get("/groups")
-def get_groups(query: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    if query:
-        # Поиск по имени (плоский список)
-        results = db.query(Group).filter(Group.name.ilike(f"%{query}%")).all()
-        return JSONResponse(content=[{"id": g.id, "name": g.name} for g in results])
-
-    # Полное дерево
-    groups = db.query(Group).all()
-    # Группируем по parent_id
-    from collections import defaultdict
-
-    # Группировка: parent_id → [subgroups]
-    children_map = defaultdict(list)
-    for group in groups:
-        children_map[group.parent_id].append(group)
-
-    def build_tree(group: Group) -> GroupOut:
-        return GroupOut(
-            id=group.id,
-            name=group.name,
-            parent_id=group.parent_id,
-            subGroups=[build_tree(child) for child in children_map.get(group.id, [])]
+    result = await db.execute(
+        insert(Group).values(**data).returning(Group.id, Group.name, Group.parent_id)
+    )
+    row = result.mappings().one()
+    await db.commit()
+    return ORJSONResponse(content={**row, "subGroups": []})
+
+@app.post("/groups/bulk", response_model=List[GroupOut])
+async def create_groups_bulk(groups: List[GroupCreate], db: AsyncSession = Depends(get_db)):
+    if not groups:
+        return []
+    if len(groups) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} groups per request"
         )
+    data = [g.model_dump() for g in groups]
+    for item in data:
+        if item["parent_id"] == 0:
+            item["parent_id"] = None
+    result = await db.execute(
+        insert(Group).returning(Group.id, Group.name, Group.parent_id, sort_by_parameter_order=True),
+        data,
+    )
+    rows = [{**row, "subGroups": []} for row in result.mappings()]
+    await db.commit()
+    return ORJSONResponse(content=rows)
 
-    roots = children_map[None]
-    return [build_tree(root) for root in roots]
+@app.get("/groups")
+async def get_groups(request: Request, query: Optional[str] = Query(None), db: AsyncSession = Depends(get_db)):
+    # Ревизию читаем из БД на каждый запрос: это один индексный lookup по PK,
+    # зато записи из других воркеров сразу меняют ETag и ключ кэша
+    result = await db.execute(_groups_revision)
+    revision = result.scalar_one()
+    etag = f'"groups-{revision}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    key = ("get_groups", query, revision)
+    response = cached_response(key)
+    if response is None:
+        if query:
+            # Поиск по имени (плоский список)
+            result = await db.execute(_groups_search, {"pattern": f"%{query}%"})
+            response = cache_response(key, [{"id": group_id, "name": name} for group_id, name in result])
+        else:
+            # Полное дерево: без pydantic и без обхода в Python, корни отдаются по мере готовности.
+            # Поток берёт своё соединение, поэтому соединение сессии возвращаем в пул сразу —
+            # иначе каждый такой запрос держал бы два соединения до конца отправки
+            await db.rollback()
+            response = cache_streaming_response(key, stream_groups_tree())
+
+    response.headers["ETag"] = etag
+    return response
 
 
 @app.get("/groups/{group_id}", response_model=GroupOut)
-def get_group(group_id: int, db: Session = Depends(get_db)):
-    group = db.query(Group).filter(Group.id == group_id).first()
+async def get_group(group_id: int, db: AsyncSession = Depends(get_db)):
+    key = ("get_group", group_id)
+    cached = cached_response(key)
+    if cached is not None:
+        return cached
+
+    group = await db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
-    return group
+    return cache_response(key, {"id": group.id, "name": group.name, "parent_id": group.parent_id, "subGroups": []})
 
 @app.put("/groups/{group_id}", response_model=GroupOut)
-def update_group(group_id: int, group: GroupOut, db: Session = Depends(get_db)):
+async def update_group(group_id: int, group: GroupOut, db: AsyncSession = Depends(get_db)):
     if group.id != group_id:
         raise HTTPException(
             status_code=400,
             detail="ID in path and body must match"
         )
 
-    db_group = db.query(Group).filter(Group.id == group_id).first()
-    if not db_group:
-        raise HTTPException(status_code=404, detail="Group not found")
-
-    # Нельзя быть родителем самому себе
-    if group.parent_id == group_id:
-        raise HTTPException(
-            status_code=400,
-            detail="Group cannot be its own parent"
+    # Циклы (в том числе родитель сам себе) запрещает БД: ограничение no_self_parent
+    # и триггер groups_no_cycle
+    try:
+        result = await db.execute(
+            _update_group,
+            {"group_id": group_id, "new_name": group.name, "new_parent_id": group.parent_id},
         )
-
-    # Если указан parent_id — проверим его существование
-    if group.parent_id is not None:
-        parent = db.query(Group).filter(Group.id == group.parent_id).first()
-        if not parent:
+    except IntegrityError as e:
+        sqlstate = getattr(e.orig, "sqlstate", None)
+        if sqlstate == CHECK_VIOLATION:
+            raise HTTPException(
+                status_code=400,
+                detail="Group cannot be its own parent or a child of its subgroup"
+            )
+        if sqlstate == FOREIGN_KEY_VIOLATION:
+            # Родителя удалили параллельно, уже после проверки EXISTS
             raise HTTPException(
                 status_code=400,
                 detail=f"Parent group with id {group.parent_id} not found"
             )
+        raise
+    row = result.mappings().one_or_none()
 
-    db_group.name = group.name
-    db_group.parent_id = group.parent_id
-    db.commit()
-    db.refresh(db_group)
-    return db_group
-
+    if row is None:
+        # Причину выясняем отдельным запросом только на пути ошибки
+        if await db.get(Group, group_id) is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Parent group with id {group.parent_id} not found"
+        )
 
+    await db.commit()
+    cache_invalidate("get_group", group_id)
+    # Поиск студентов фильтрует и по имени группы
+    cache_invalidate("get_students")
+    return ORJSONResponse(content={**row, "subGroups": []})
 
-@app.delete("/groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_group(group_id: int, db: Session = Depends(get_db)):
-    group = db.query(Group).filter(Group.id == group_id).first()
 
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
 
+@app.delete("/groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_group(group_id: int, db: AsyncSession = Depends(get_db)):
     # Проверка: есть ли подгруппы
-    has_children = db.query(Group).filter(Group.parent_id == group_id).first()
+    result = await db.execute(_group_has_children, {"group_id": group_id})
+    has_children = result.scalar()
     if has_children:
         raise HTTPException(
             status_code=409,
             detail="Cannot delete group with existing subgroups"
         )
 
-    db.delete(group)
-    db.commit()
+    try:
+        result = await db.execute(_delete_group, {"group_id": group_id})
+    except IntegrityError as e:
+        if getattr(e.orig, "sqlstate", None) != FOREIGN_KEY_VIOLATION:
+            raise
+        # Подгруппу добавили параллельно, уже после проверки EXISTS
+        raise HTTPException(
+            status_code=409,
+            detail="Cannot delete group with existing subgroups"
+        )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Group not found")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+    await db.commit()
+    cache_invalidate("get_group", group_id)
+    # Студенты удалённой группы остаются с group_id = NULL
+    cache_invalidate("get_student")
+    cache_invalidate("get_students")